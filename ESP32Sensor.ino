@@ -31,6 +31,14 @@ const int UMID_BAGNATO = 1400;
 // =======================
 volatile int Xs = 1;
 
+// =======================
+// ID NODO (VISTA FLOTTA)
+// "" = nessun campo ID: il nodo è il sensore principale di Python
+// Impostare un ID univoco solo se le righe arrivano a Python
+// insieme a quelle di altri nodi (es. tramite un relay/gateway)
+// =======================
+const char* NODE_ID = "";
+
 // =======================
 // VARIABILI CONDIVISE
 // =======================
@@ -151,7 +159,13 @@ void TaskCore1code(void* pvParameters) {
                 SerialBT.print(temperatura_globale, 2);
 
             SerialBT.print(";H=");
-            SerialBT.println(umidita_globale);
+            SerialBT.print(umidita_globale);
+
+            if (NODE_ID[0] != '\0') {
+                SerialBT.print(";ID=");
+                SerialBT.print(NODE_ID);
+            }
+            SerialBT.println();
         }
 
         vTaskDelay(20 / portTICK_PERIOD_MS);
@@ -1,3 +1,6 @@
+import os  # Percorsi file di lavoro dei report
+import shutil  # Pulizia cartella temporanea report
+import tempfile  # Cartella temporanea per dati passati al processo report
 import threading  # Permette di eseguire operazioni in parallelo (lettura Bluetooth in background)
 import time  # Gestione del tempo e delay per sincronizzare i dati
 import numpy as np  # Calcoli matematici avanzati e array numerici per regressioni
@@ -6,10 +9,15 @@ import matplotlib  # Libreria professionale per creazione grafici scientifici
 matplotlib.use("TkAgg")  # Backend grafico specifico per integrazione perfetta con Tkinter
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg  # Widget ponte tra Matplotlib e Tkinter
 import matplotlib.pyplot as plt  # Strumenti di disegno e personalizzazione grafici
+from matplotlib.collections import LineCollection, PolyCollection  # Artisti condivisi vista flotta (un solo oggetto per N pannelli)
+from matplotlib.transforms import Bbox, TransformedBbox  # Riquadri pannelli flotta (clip testi + regioni blit)
+from matplotlib.widgets import SpanSelector  # Selezione intervallo temporale trascinando sul grafico
 import serial  # Comunicazione seriale per ricevere dati dall'ESP32 via Bluetooth
 import pandas as pd  # Manipolazione dati per esportazione Excel professionale
 from tkinter import filedialog  # Finestra nativa sistema per selezione percorsi salvataggio
 from tkinter import messagebox  # Popup informativi, di avviso e gestione errori
+import report_renderer  # Rendering report offscreen (Agg) in un processo separato
+from indice_statistico import IndiceStatistico  # Statistiche O(1)/O(log n) su qualsiasi intervallo
 
 
 # ===============================
@@ -17,6 +25,23 @@ from tkinter import messagebox  # Popup informativi, di avviso e gestione errori
 # ===============================
 BT_PORT = "COM7"  # Porta seriale Windows dove è collegato l'ESP32 (modificare se necessario)
 BT_BAUD = 115200  # Velocità trasmissione dati standard per ESP32 (115200 baud = molto veloce)
+SENSORE_PRINCIPALE = BT_PORT  # ID sensore mostrato nei grafici singoli (righe senza "ID=" usano questo)
+STORICO_MAX_PUNTI = 172800  # Storico statistiche sensore principale: 2 giorni a 1 campione/s (~54MB per serie a regime, ~107MB in totale)
+
+
+# ===============================
+# CONFIGURAZIONE VISTA FLOTTA
+# ===============================
+FLOTTA_MAX_PANNELLI = 64  # Pannelli preallocati (sensori oltre questo numero non vengono mostrati)
+FLOTTA_MAX_PUNTI = 300  # Punti memorizzati per ogni sensore (FIFO come serie principale)
+FLOTTA_PUNTI_SPARKLINE = 60  # Ultimi N punti disegnati in ogni sparkline
+FLOTTA_TIMEOUT = 10  # Secondi senza dati dopo cui il pannello diventa grigio (sensore muto)
+FLOTTA_TESTI_PER_FRAME = 8  # Max testi ridisegnati per frame per la sola pendenza (a rotazione); ID e valore attuale sempre subito
+REPORT_PERIODO = 3600  # Durata finestra report periodici per sensore (s): 3600 = orari
+SOGLIE_ALLARME = {  # Intervallo valori normali per grandezza: fuori soglia → pannello rosso
+    "umidita": (30, 70),  # Umidità % accettabile
+    "temperatura": (10, 30),  # Temperatura °C accettabile
+}
 
 
 # ===============================
@@ -27,14 +52,36 @@ umidita = []  # Lista valori umidità % ricevuti dall'ESP32 (asse Y umidità)
 temperatura = []  # Lista valori temperatura °C ricevuti dall'ESP32 (asse Y temperatura)
 lock = threading.Lock()  # Semaforo mutex per accesso sicuro alle liste da più thread
 start_time = time.time()  # Timestamp assoluto inizio acquisizione dati
+start_flotta = time.time()  # Cronometro separato vista flotta (non dipende dal sensore principale)
+inizio_pausa = None  # Timestamp pressione STOP (per escludere la pausa dal cronometro flotta)
 MODALITA = None  # Memorizza modalità grafico attiva ("umidita", "temperatura", "entrambe")
 aggiornamento_attivo = True  # Flag booleano: True=acquisizione/grafico attivi, False=pausa
 metriche_label = None  # Widget Label che visualizza statistiche regressione
+indice_umidita = IndiceStatistico(STORICO_MAX_PUNTI)  # Somme cumulative storico umidità
+indice_temperatura = IndiceStatistico(STORICO_MAX_PUNTI)  # Somme cumulative storico temperatura
+intervallo_stat = None  # Intervallo (t_da, t_a) selezionato sul grafico (None = storico completo)
+selettore_intervallo = None  # Riferimento SpanSelector (senza riferimento verrebbe distrutto)
+rettangolo_intervallo = None  # Evidenziazione intervallo selezionato sul grafico
+testo_regressione = ""  # Ultimo testo metriche regressione (per aggiornare solo la parte intervallo)
 mostra_metriche = False  # Flag visibilità pannello statistiche (True=visibile)
 pulsante_stop = None  # Riferimento al widget pulsante STOP/PLAY per modifica dinamica
 ignora_prossimo_dato = False  # Flag per resettare cronometro dopo pausa/ripresa
 lista_dati = None  # Widget Listbox che mostra cronologia dati ricevuti
 app_in_esecuzione = True  # Flag principale: False termina tutti i thread/background
+flotta = {}  # Serie per sensore: {id: {"secondi": [], "umidita": [], "temperatura": []}}
+grandezza_flotta = "temperatura"  # Grandezza mostrata nei pannelli flotta ("umidita" o "temperatura")
+pulsante_grandezza = None  # Riferimento pulsante cambio grandezza vista flotta
+linee_flotta = None  # LineCollection unica con tutte le sparkline
+sfondi_flotta = None  # PolyCollection unica con gli sfondi colorati dei pannelli
+testi_flotta = []  # Pool di Text preallocati (uno per pannello)
+celle_flotta = []  # Origine (x0, y0) di ogni pannello in coordinate dati
+pannelli_disposti = -1  # Numero pannelli dell'ultima disposizione griglia (-1 = da calcolare)
+riquadri_flotta = []  # Riquadro di ogni pannello in pixel (segue ridimensionamenti finestra)
+strato_testi_flotta = None  # Buffer sfondi + testi già disegnati (ripristinato a ogni frame)
+regioni_sfondo_flotta = []  # Buffer solo sfondo di ogni pannello (per ridisegnare un testo)
+testi_mostrati = []  # Stringhe presenti in strato_testi_flotta (ridisegno solo se cambiano)
+colori_sfondi_mostrati = None  # Colori sfondi dell'ultimo ridisegno completo
+turno_testi = 0  # Primo pannello da cui riprendere l'aggiornamento testi (rotazione)
 
 
 # ===============================
@@ -90,41 +137,56 @@ def bluetooth_reader():  # Thread background continuo per lettura seriale non bl
             if not line.startswith("DATA;"):  
                 continue  # Ignora righe invalide (rumore, comandi, errori)
 
-            # Parsing dati: "DATA;T=23.5;U=65" → t_val=23.5, h_val=65
-            parts = line.split(";")  # Split su separatore ";"
-            t_val = float(parts[1].split("=")[1])  # Estrae temperatura dopo "T="
-            h_val = int(parts[2].split("=")[1])  # Estrae umidità dopo "U="
+            # Parsing dati: "DATA;T=23.5;H=65[;ID=serra1]" → campi chiave=valore
+            campi = dict(p.split("=", 1) for p in line.split(";")[1:] if "=" in p)
+            t_val = float(campi["T"])  # Estrae temperatura dopo "T="
+            h_val = int(campi["H"] if "H" in campi else campi["U"])  # Estrae umidità dopo "H=" (o "U=")
+            id_sensore = campi.get("ID", SENSORE_PRINCIPALE)  # Nodi senza ID = sensore principale
 
             # Processa solo se acquisizione attiva (non in pausa)
             if aggiornamento_attivo:  
                 with lock:  # Sezione critica: accesso esclusivo alle liste dati
                     global ignora_prossimo_dato, start_time  # Variabili per gestione pausa
 
-                    # Gestione ripresa dopo pausa: reset temporale corretto
-                    if ignora_prossimo_dato:  
-                        ignora_prossimo_dato = False  
-                        if len(secondi) > 0:  
-                            ultimo_tempo = secondi[-1]  # Riprende da ultimo tempo valido
-                            start_time = time.time() - ultimo_tempo  # Risincronizza
-                    else:
-                        # Calcolo tempo relativo dall'inizio acquisizione
-                        t = time.time() - start_time  
-                        # Append sicuri (liste thread-safe con lock)
-                        secondi.append(t)  
-                        temperatura.append(t_val)  
-                        umidita.append(h_val)  
-
-                    # Aggiornamento interfaccia listbox dal thread principale
-                    try:  
-                        root.after(0, aggiorna_listbox_safe, t, t_val, h_val)  
-                    except:  
-                        pass  # Ignora se interfaccia non pronta
-
-                    # Limitazione memoria: max 300 punti (~1-2min a 115200baud)
-                    if len(secondi) > 300:  
-                        secondi.pop(0)  # Rimuove dato più vecchio (FIFO)
-                        temperatura.pop(0)  
-                        umidita.pop(0)  
+                    # Serie principale: solo il sensore mostrato nei grafici singoli
+                    if id_sensore == SENSORE_PRINCIPALE:  
+                        # Gestione ripresa dopo pausa: reset temporale corretto
+                        if ignora_prossimo_dato:  
+                            ignora_prossimo_dato = False  
+                            if len(secondi) > 0:  
+                                ultimo_tempo = secondi[-1]  # Riprende da ultimo tempo valido
+                                start_time = time.time() - ultimo_tempo  # Risincronizza
+                        else:
+                            # Calcolo tempo relativo dall'inizio acquisizione
+                            t = time.time() - start_time  
+                            # Append sicuri (liste thread-safe con lock)
+                            secondi.append(t)  
+                            temperatura.append(t_val)  
+                            umidita.append(h_val)  
+                            indice_temperatura.aggiungi(t, t_val)  # Storico lungo con somme cumulative
+                            indice_umidita.aggiungi(t, h_val)  
+
+                        # Aggiornamento interfaccia listbox dal thread principale
+                        try:  
+                            root.after(0, aggiorna_listbox_safe, t, t_val, h_val)  
+                        except:  
+                            pass  # Ignora se interfaccia non pronta
+
+                        # Limitazione memoria: max 300 punti (~1-2min a 115200baud)
+                        if len(secondi) > 300:  
+                            secondi.pop(0)  # Rimuove dato più vecchio (FIFO)
+                            temperatura.pop(0)  
+                            umidita.pop(0)  
+
+                    # Serie per sensore della vista flotta (cronometro proprio, sempre crescente)
+                    serie = flotta.setdefault(id_sensore, {"secondi": [], "umidita": [], "temperatura": []})  
+                    serie["secondi"].append(time.time() - start_flotta)  
+                    serie["temperatura"].append(t_val)  
+                    serie["umidita"].append(h_val)  
+                    if len(serie["secondi"]) > FLOTTA_MAX_PUNTI:  
+                        serie["secondi"].pop(0)  # FIFO per sensore
+                        serie["temperatura"].pop(0)  
+                        serie["umidita"].pop(0)  
         except Exception as e:  # Gestione disconnessioni improvvise
             if app_in_esecuzione:  
                 print(f"Errore thread Bluetooth: {e}")
@@ -225,6 +287,9 @@ def mostra_menu_iniziale():
         secondi = []  # Reset tempo
         umidita = []  # Reset umidità
         temperatura = []  # Reset temperatura
+        flotta.clear()  # Reset serie di tutti i sensori
+        indice_umidita.azzera()  # Reset storico statistiche
+        indice_temperatura.azzera()  
 
     # Distrugge tutti i widget figli (pulizia totale interfaccia)
     for w in root.winfo_children():  
@@ -252,6 +317,7 @@ def mostra_menu_iniziale():
     fancy_button("UMIDITÀ", lambda: avvia_grafico("umidita")).pack(pady=10)  
     fancy_button("TEMPERATURA", lambda: avvia_grafico("temperatura")).pack(pady=10)  
     fancy_button("UMIDITÀ + TEMPERATURA", lambda: avvia_grafico("entrambe")).pack(pady=10)  
+    fancy_button("FLOTTA SENSORI", avvia_flotta).pack(pady=10)  
 
 
 # ===============================
@@ -271,6 +337,62 @@ def calcola_metriche(y_real, y_pred):
         return 0, 0, 0  # Valori safe in caso errore
 
 
+# ===============================
+# STATISTICHE INTERVALLO (SOMME CUMULATIVE)
+# ===============================
+def testo_statistiche_intervallo():  
+    """Statistiche su intervallo selezionato (o storico completo) lette dall'indice in O(log n)"""
+    serie = [("UMIDITÀ", indice_umidita, "%"), ("TEMPERATURA", indice_temperatura, "°C")]  
+    if MODALITA == "umidita":  
+        serie = serie[:1]  
+    elif MODALITA == "temperatura":  
+        serie = serie[1:]  
+
+    t_da, t_a = intervallo_stat if intervallo_stat else (None, None)  
+    righe = []
+    with lock:  # Indici aggiornati dal thread Bluetooth
+        for nome, indice, unita in serie:  
+            st = indice.statistiche(t_da, t_a)  
+            if st is None:  
+                righe.append(f"{nome}: nessun dato nell'intervallo")
+                continue
+            if not righe:  # Intestazione con intervallo effettivo dei campioni
+                titolo = "INTERVALLO" if intervallo_stat else "STORICO COMPLETO"
+                righe.append(f"=== {titolo} {st['t_da']:.1f}–{st['t_a']:.1f}s (n={st['n']}) ===")
+            righe.append(
+                f"{nome}: media {st['media']:.2f}{unita} | σ {st['dev_std']:.2f} | "
+                f"min {st['min']:.1f} | max {st['max']:.1f} | pendenza {st['pendenza'] * 60:+.3f}/min"
+            )
+    return "\n".join(righe)
+
+
+def aggiorna_pannello_metriche(testo):  
+    """Mostra metriche regressione finestra corrente + statistiche intervallo"""
+    global testo_regressione
+    testo_regressione = testo  
+    metriche_label.config(text=f"{testo}\n\n{testo_statistiche_intervallo()}")  
+
+
+def disegna_intervallo():  
+    """Evidenzia sul grafico l'intervallo selezionato (rimuove il precedente)"""
+    global rettangolo_intervallo
+    if rettangolo_intervallo is not None:  
+        rettangolo_intervallo.remove()  
+    rettangolo_intervallo = ax.axvspan(*intervallo_stat, color="yellow", alpha=0.15) if intervallo_stat else None  
+
+
+def seleziona_intervallo(t_min, t_max):  
+    """Callback SpanSelector: salva intervallo (click senza trascinare = storico completo)"""
+    global intervallo_stat
+    try:
+        intervallo_stat = (t_min, t_max) if t_max - t_min > 1e-6 else None  
+        aggiorna_pannello_metriche(testo_regressione)  # Risposta immediata anche in pausa
+        disegna_intervallo()  
+        canvas.draw_idle()  
+    except Exception as e:
+        print(f"Errore selezione intervallo: {e}")
+
+
 # ===============================
 # TOGGLE VISIBILITÀ METRICHE
 # ===============================
@@ -292,18 +414,27 @@ def toggle_metriche():
 # ===============================
 def toggle_aggiornamento():  
     """Alterna STOP/PLAY: pausa/ripresa acquisizione dati e refresh grafico"""
-    global aggiornamento_attivo, start_time, ignora_prossimo_dato
+    global aggiornamento_attivo, start_time, ignora_prossimo_dato, start_flotta, inizio_pausa
     try:
         if aggiornamento_attivo:  # Da PLAY → STOP
             aggiornamento_attivo = False  
+            inizio_pausa = time.time()  
             status.set("Aggiornamento fermato")  
             pulsante_stop.config(text="PLAY", bg="#55ff55", fg="#000000")  # Verde PLAY
         else:  # Da STOP → PLAY
             ignora_prossimo_dato = True  # Flag per risincronizzare tempo
+            if inizio_pausa is not None:  
+                with lock:  # Cronometro flotta: sposta in avanti della durata pausa (nessun salto)
+                    start_flotta += time.time() - inizio_pausa  
+                inizio_pausa = None  
             aggiornamento_attivo = True  
             status.set("Aggiornamento attivo")  
             pulsante_stop.config(text="STOP", bg="#ff5555", fg="#ffffff")  # Rosso STOP
-            aggiorna_grafico()  # Riavvia ciclo refresh grafico
+            # Riavvia ciclo refresh della vista attiva
+            if MODALITA == "flotta":  
+                aggiorna_flotta()  
+            else:  
+                aggiorna_grafico()  
     except Exception as e:
         print(f"Errore toggle aggiornamento: {e}")
 
@@ -312,14 +443,11 @@ def toggle_aggiornamento():
 # ESPORTAZIONE GRAFICO + DATI EXCEL
 # ===============================
 def salva_grafico_e_excel():  
-    """Esporta screenshot grafico PNG + dati Excel con fogli separati per modalità"""
-    global MODALITA, secondi, umidita, temperatura, fig
+    """Esporta dati Excel subito + grafico PNG renderizzato in background (senza pausa)"""
+    global MODALITA, secondi, umidita, temperatura
 
     # Controlli di sicurezza pre-salvataggio
-    if aggiornamento_attivo:  
-        messagebox.showwarning("Pausa richiesta", "Salvataggio solo con grafico in STOP.")
-        return
-    if len(secondi) < 1:  
+    if len(secondi) < 1 and not (MODALITA == "flotta" and flotta):  
         messagebox.showwarning("Nessun dato", "Acquisisci dati prima di salvare.")
         return
 
@@ -332,21 +460,14 @@ def salva_grafico_e_excel():
     if not file_base:  # Annullato dall'utente
         return
 
-    # Salvataggio PNG ad alta risoluzione (150 DPI professionale)
-    try:
-        fig.savefig(file_base + ".png", dpi=150, bbox_inches='tight')  
-        print(f"✓ PNG salvato: {file_base}.png")
-    except Exception as e:
-        messagebox.showerror("Errore PNG", f"Impossibile salvare immagine:\n{e}")
-        return
+    # Istantanea dati thread-safe: l'acquisizione continua durante il salvataggio
+    with lock:  
+        t = list(secondi)  # Copia tempi
+        u = list(umidita)  # Copia umidità
+        temp = list(temperatura)  # Copia temperatura
+        serie_flotta = {sid: {k: list(v) for k, v in d.items()} for sid, d in flotta.items()}  # Copia flotta
 
-    # Preparazione dati thread-safe per Excel
     try:
-        with lock:  
-            t = list(secondi)  # Copia tempi
-            u = list(umidita)  # Copia umidità
-            temp = list(temperatura)  # Copia temperatura
-
         # ExcelWriter con motore xlsxwriter (formattazione professionale)
         writer = pd.ExcelWriter(file_base + ".xlsx", engine="xlsxwriter")  
 
@@ -366,16 +487,89 @@ def salva_grafico_e_excel():
             df_um.to_excel(writer, sheet_name="Umidita", index=False)  
             df_t.to_excel(writer, sheet_name="Temperatura", index=False)  
 
+        elif MODALITA == "flotta":  
+            # Un foglio per sensore (nome foglio Excel max 31 caratteri)
+            fogli = report_renderer.nomi_fogli_excel(sorted(serie_flotta))  
+            for sid, d in sorted(serie_flotta.items()):  
+                df_s = pd.DataFrame({"Tempo_s": d["secondi"], "Temperatura_C": d["temperatura"], "Umidita_%": d["umidita"]})  
+                df_s.to_excel(writer, sheet_name=fogli[sid], index=False)  
+
         writer.close()  # Commit e chiusura file Excel
         print(f"✓ Excel salvato: {file_base}.xlsx")
-
-        # Conferma successo con lista file generati
-        messagebox.showinfo(  
-            "Salvataggio completato!",
-            f"File esportati con successo:\n\n{file_base}.png\n{file_base}.xlsx"
-        )
     except Exception as e:
         messagebox.showerror("Errore Excel", f"Impossibile salvare dati:\n{e}")
+        return
+
+    # PNG offscreen nel processo report: grafico singolo o un file per sensore
+    if MODALITA == "flotta":  
+        serie = serie_flotta  
+        nomi = report_renderer.nomi_file_sensori(sorted(serie_flotta))  # ID con caratteri non ammessi nei file
+        report = [  
+            {"file": f"{file_base}_{nomi[sid]}", "sensore": sid, "grandezza": "entrambe", "formati": ["png"]}
+            for sid in sorted(serie_flotta)
+        ]
+    else:  
+        serie = {SENSORE_PRINCIPALE: {"secondi": t, "umidita": u, "temperatura": temp}}  
+        report = [{"file": file_base, "sensore": SENSORE_PRINCIPALE, "grandezza": MODALITA, "formati": ["png"]}]  
+    avvia_report(serie, report, f"{file_base}.xlsx")  
+
+
+# ===============================
+# REPORT PERIODICI FLOTTA
+# ===============================
+def report_periodici_flotta():  
+    """Genera un report PNG per ogni sensore e ogni finestra REPORT_PERIODO (in background)"""
+    cartella = filedialog.askdirectory(title="Scegli cartella report")  
+    if not cartella:  # Annullato dall'utente
+        return
+
+    with lock:  # Istantanea thread-safe di tutti i sensori
+        serie_flotta = {sid: {k: list(v) for k, v in d.items()} for sid, d in flotta.items()}  
+    report = report_renderer.pianifica_report_periodici(serie_flotta, cartella, REPORT_PERIODO)  
+    if not report:  
+        messagebox.showwarning("Nessun dato", "Acquisisci dati prima di generare report.")
+        return
+    avvia_report(serie_flotta, report, cartella)  
+
+
+# ===============================
+# AVVIO E MONITORAGGIO PROCESSO REPORT
+# ===============================
+def avvia_report(serie, report, descrizione):  
+    """Scrive file di lavoro e lancia il renderer in un processo separato (GUI mai bloccata)"""
+    cartella_lavoro = None  # Creata sotto: se fallisce mkdtemp non c'è nulla da pulire
+    try:
+        cartella_lavoro = tempfile.mkdtemp(prefix="esp32_report_")  # Dati passati al worker
+        lavoro = report_renderer.scrivi_lavoro(os.path.join(cartella_lavoro, "lavoro"), serie, report)  
+        log = os.path.join(cartella_lavoro, "lavoro.log")  
+        processo = report_renderer.avvia_in_background(lavoro, log)  
+        print(f"Report in generazione: {len(report)} grafici")
+        root.after(500, controlla_report, processo, cartella_lavoro, log, descrizione)  # Polling non bloccante
+    except Exception as e:
+        if cartella_lavoro is not None:  
+            shutil.rmtree(cartella_lavoro, ignore_errors=True)  # Nessun worker partito: pulizia subito
+        messagebox.showerror("Errore report", f"Impossibile avviare generazione report:\n{e}")
+
+
+def controlla_report(processo, cartella_lavoro, log, descrizione):  
+    """Polling fine processo report: notifica esito e pulisce file temporanei"""
+    if processo.poll() is None:  # Ancora in esecuzione: ricontrolla tra 500ms
+        root.after(500, controlla_report, processo, cartella_lavoro, log, descrizione)  
+        return
+
+    try:
+        with open(log, encoding="utf-8", errors="replace") as f:  # Byte non UTF-8 → "?" (mai eccezioni nel callback Tk)
+            output = f.read().strip()  
+    except OSError:
+        output = ""
+    shutil.rmtree(cartella_lavoro, ignore_errors=True)  # Cleanup dati temporanei
+
+    # Popup esito (ultime righe output in caso di errore)
+    if processo.returncode == 0:  
+        print(output)
+        messagebox.showinfo("Salvataggio completato!", f"{output}\n\n{descrizione}")
+    else:  
+        messagebox.showerror("Errore report", f"Generazione report fallita:\n{output[-500:]}")
 
 
 # ===============================
@@ -383,12 +577,18 @@ def salva_grafico_e_excel():
 # ===============================
 def avvia_grafico(mod):  
     """Setup completo interfaccia modalità grafico: GUI + Matplotlib + controlli"""
-    global MODALITA, aggiornamento_attivo, fig, ax, canvas, metriche_label, pulsante_stop, start_time, lista_dati
+    global MODALITA, aggiornamento_attivo, fig, ax, canvas, metriche_label, pulsante_stop, start_time, lista_dati, start_flotta, inizio_pausa
+    global intervallo_stat, selettore_intervallo, rettangolo_intervallo, testo_regressione
 
     # Reset sessione: modalità, stato, cronometro
     MODALITA = mod  
     aggiornamento_attivo = True  
     start_time = time.time()  
+    start_flotta = start_time  # Cronometro flotta riparte con la sessione
+    inizio_pausa = None  
+    intervallo_stat = None  # Nessun intervallo selezionato
+    testo_regressione = ""  # Niente metriche della modalità precedente
+    rettangolo_intervallo = None  
 
     # Cleanup interfaccia precedente
     for w in root.winfo_children():  
@@ -454,7 +654,7 @@ def avvia_grafico(mod):
     # Pannello metriche nascoste (row 4)
     metriche_label = tk.Label(  
         root,
-        text="Statistiche regressione caricate automaticamente...",
+        text="Statistiche regressione caricate automaticamente...\nTrascina sul grafico per selezionare un intervallo",
         font=("Courier", 11, "bold"),
         bg="#111111",  # Sfondo nero opaco
         fg="#00ff88",  # Verde neon metriche
@@ -473,6 +673,9 @@ def avvia_grafico(mod):
     canvas = FigureCanvasTkAgg(fig, master=frame_grafico)  
     canvas.get_tk_widget().pack(fill="both", expand=True)  
 
+    # Selezione intervallo trascinando in orizzontale (statistiche nel pannello DETTAGLI)
+    selettore_intervallo = SpanSelector(ax, seleziona_intervallo, "horizontal", props=dict(facecolor="yellow", alpha=0.15))  
+
     # Pulsante INDIETRO (blu)
     tk.Button(  
         frame_pulsante,
@@ -543,6 +746,7 @@ def avvia_grafico(mod):
 # ===============================
 def aggiorna_grafico():  
     """Ciclo principale rendering: regressioni lineari/quadatiche + metriche live"""
+    global rettangolo_intervallo
     # Early exit se app chiusa o in pausa
     if not aggiornamento_attivo or not app_in_esecuzione:  
         return
@@ -568,6 +772,8 @@ def aggiorna_grafico():
 
         # Reset asse grafico (pulizia frame precedente)
         ax.clear()  
+        rettangolo_intervallo = None  # Rimosso da clear(), ridisegnato sotto
+        disegna_intervallo()  
         ax.grid(True, alpha=0.3)  # Griglia leggera professionale
         ax.set_xlabel("Tempo (s)", fontsize=10)  
         
@@ -618,7 +824,7 @@ def aggiorna_grafico():
                     testo_metriche += f"Equazione: y = {a:.4f}x² + {b:.2f}x + {c:.2f}\n"
                     testo_metriche += f"MSE: {mse_par:.2f} | RMSE: {rmse_par:.2f} | R²: {r2_par:.4f}"
 
-                metriche_label.config(text=testo_metriche)  
+                aggiorna_pannello_metriche(testo_metriche)  
 
             ax.legend(loc='best')  # Legenda automatica posizione ottimale
 
@@ -678,7 +884,7 @@ def aggiorna_grafico():
                     testo_metriche += f"PARABOLA: y={a_temp:.4f}x²+{b_temp:.2f}x+{c_temp:.2f}\n"
                     testo_metriche += f"  MSE:{mse_temp_p:6.2f}  RMSE:{rmse_temp_p:5.2f}  R²:{r2_temp_p:.4f}"
                 
-                metriche_label.config(text=testo_metriche)  
+                aggiorna_pannello_metriche(testo_metriche)  
 
             ax.legend(loc='best')  
 
@@ -702,6 +908,346 @@ def aggiorna_grafico():
         root.after(INTERVALLO, aggiorna_grafico)  
 
 
+# ===============================
+# DISPOSIZIONE GRIGLIA PANNELLI FLOTTA
+# ===============================
+def disponi_pannelli_flotta(n):  
+    """Ricalcola griglia small-multiples per n sensori: sposta sfondi e testi preallocati"""
+    global celle_flotta, pannelli_disposti, riquadri_flotta, strato_testi_flotta
+    colonne = max(1, int(np.ceil(np.sqrt(n * 2))))  # Griglia più larga che alta (pannelli 2:1)
+    righe = max(1, int(np.ceil(n / colonne)))  
+
+    # Origine pannelli in coordinate dati (riga 0 in alto)
+    celle_flotta = [(i % colonne, righe - 1 - i // colonne) for i in range(n)]  
+    ax.set_xlim(0, colonne)  
+    ax.set_ylim(0, righe)  
+
+    # Sfondi: un rettangolo con margine per pannello, tutti nella stessa PolyCollection
+    sfondi_flotta.set_verts([  
+        [(x0 + 0.02, y0 + 0.03), (x0 + 0.98, y0 + 0.03), (x0 + 0.98, y0 + 0.97), (x0 + 0.02, y0 + 0.97)]
+        for x0, y0 in celle_flotta
+    ])
+    riquadri_flotta = [  
+        TransformedBbox(Bbox([[x0 + 0.02, y0 + 0.03], [x0 + 0.98, y0 + 0.97]]), ax.transData)
+        for x0, y0 in celle_flotta
+    ]
+
+    # Testi: riposiziona i primi n del pool (ritagliati sul proprio pannello), nasconde gli altri
+    dimensione_font = max(6, 13 - righe)  # Font più piccolo con più righe
+    for i, testo in enumerate(testi_flotta):  
+        if i < n:  
+            x0, y0 = celle_flotta[i]
+            testo.set_position((x0 + 0.06, y0 + 0.92))  
+            testo.set_fontsize(dimensione_font)  
+            testo.set_clip_box(riquadri_flotta[i])  # Il testo non sporca i pannelli vicini
+            testo.set_visible(True)  
+        else:  
+            testo.set_visible(False)  
+    pannelli_disposti = n  
+    strato_testi_flotta = None  # Cache non più valida: ridisegno completo al prossimo frame
+
+
+# ===============================
+# INIZIALIZZAZIONE VISTA FLOTTA
+# ===============================
+def avvia_flotta():  
+    """Setup vista flotta: una figura, artisti condivisi preallocati per tutti i sensori"""
+    global MODALITA, aggiornamento_attivo, fig, ax, canvas, pulsante_stop, pulsante_grandezza, start_time, lista_dati, start_flotta, inizio_pausa
+    global linee_flotta, sfondi_flotta, testi_flotta, pannelli_disposti, strato_testi_flotta
+
+    # Reset sessione: modalità, stato, cronometro
+    MODALITA = "flotta"  
+    aggiornamento_attivo = True  
+    start_time = time.time()  
+    start_flotta = start_time  # Cronometro flotta riparte con la sessione
+    inizio_pausa = None  
+    lista_dati = None  # Nessuna listbox in vista flotta
+
+    # Cleanup interfaccia precedente
+    for w in root.winfo_children():  
+        w.destroy()  
+
+    # Header titolo modalità attiva
+    tk.Label(  
+        root,
+        text="ESP32 REAL-TIME · FLOTTA",
+        font=("Segoe UI", 16, "bold"),
+        bg=BG,
+        fg=TXT
+    ).grid(row=0, column=0, columnspan=2, pady=(10, 5))
+
+    # Status bar sensori attivi (dinamica)
+    tk.Label(  
+        root,
+        textvariable=status,
+        font=("Segoe UI", 10),
+        bg=BG,
+        fg="#aaaaaa"
+    ).grid(row=1, column=0, columnspan=2, pady=5)
+
+    # Frame grafico a tutta larghezza (niente lista dati)
+    frame_grafico = tk.Frame(root, bg=BG)  
+    frame_grafico.grid(row=2, column=0, columnspan=2, sticky="nsew", padx=10, pady=5)  
+
+    # Barra controlli inferiore
+    frame_pulsante = tk.Frame(root, bg=BG)  
+    frame_pulsante.grid(row=3, column=0, columnspan=2, sticky="ew", padx=10, pady=10)  
+
+    # Figura unica: un solo asse invisibile, pannelli disegnati in coordinate dati
+    plt.style.use("dark_background")  
+    fig = plt.figure(figsize=(10, 4), dpi=100)  
+    ax = fig.add_axes([0, 0, 1, 1])  # Asse a tutta figura
+    ax.set_axis_off()  # Niente tick/assi: il costo non cresce con i pannelli
+
+    # Artisti condivisi: sfondi e sparkline di TUTTI i pannelli in 2 collezioni
+    # (animated=True → esclusi dal ridisegno completo, disegnati a mano sopra lo strato cachato)
+    sfondi_flotta = PolyCollection([], facecolors="#1a1a1a", edgecolors="#333333", linewidths=0.8)  
+    linee_flotta = LineCollection([], linewidths=1.2, animated=True)  
+    ax.add_collection(sfondi_flotta)  
+    ax.add_collection(linee_flotta)  
+
+    # Pool testi preallocati (valore attuale + pendenza), ridisegnati solo se cambia la stringa
+    testi_flotta = [  
+        ax.text(0, 0, "", color=TXT, va="top", ha="left", family="monospace", visible=False, animated=True, clip_on=True)
+        for _ in range(FLOTTA_MAX_PANNELLI)
+    ]
+    pannelli_disposti = -1  # Forza disposizione al primo frame
+    strato_testi_flotta = None  # Forza ridisegno completo al primo frame
+
+    # Integrazione canvas Matplotlib → Tkinter
+    canvas = FigureCanvasTkAgg(fig, master=frame_grafico)  
+    canvas.get_tk_widget().pack(fill="both", expand=True)  
+    canvas.mpl_connect("draw_event", cattura_strati_flotta)  # Ricattura strati dopo ogni ridisegno completo
+
+    # Pulsante INDIETRO (blu)
+    tk.Button(  
+        frame_pulsante,
+        text="← INDIETRO",
+        font=("Segoe UI", 12, "bold"),
+        bg="#5555ff",  # Blu primario
+        fg="#ffffff",
+        relief="flat",
+        bd=0,
+        width=12,
+        height=1,
+        cursor="hand2",
+        command=lambda: mostra_menu_iniziale()
+    ).pack(side="left", padx=(0, 10))
+
+    # Pulsante STOP/PLAY dinamico (rosso/verde)
+    pulsante_stop = tk.Button(  
+        frame_pulsante,
+        text="STOP",  # Stato iniziale
+        font=("Segoe UI", 12, "bold"),
+        bg="#ff5555",  # Rosso stop
+        fg="#ffffff",
+        relief="flat",
+        bd=0,
+        width=12,
+        height=1,
+        cursor="hand2",
+        command=toggle_aggiornamento
+    )
+    pulsante_stop.pack(side="left", padx=(0, 10))
+
+    # Pulsante cambio grandezza pannelli (verde)
+    pulsante_grandezza = tk.Button(  
+        frame_pulsante,
+        text="MOSTRA UMIDITÀ" if grandezza_flotta == "temperatura" else "MOSTRA TEMPERATURA",
+        font=("Segoe UI", 12, "bold"),
+        bg="#55ff55",  # Verde info
+        fg="#000000",
+        relief="flat",
+        bd=0,
+        width=20,
+        height=1,
+        cursor="hand2",
+        command=toggle_grandezza_flotta
+    )
+    pulsante_grandezza.pack(side="left")
+
+    # Pulsante SALVA (arancione)
+    tk.Button(  
+        frame_pulsante,
+        text="Salva PNG + Excel",
+        font=("Segoe UI", 12, "bold"),
+        bg="#ffaa00",  # Arancione salvataggio
+        fg="#000000",
+        relief="flat",
+        bd=0,
+        width=16,
+        height=1,
+        cursor="hand2",
+        command=salva_grafico_e_excel
+    ).pack(side="left", padx=(10, 0))
+
+    # Pulsante REPORT periodici per tutti i sensori (viola)
+    tk.Button(  
+        frame_pulsante,
+        text="REPORT PERIODICI",
+        font=("Segoe UI", 12, "bold"),
+        bg="#aa55ff",  # Viola report
+        fg="#ffffff",
+        relief="flat",
+        bd=0,
+        width=16,
+        height=1,
+        cursor="hand2",
+        command=report_periodici_flotta
+    ).pack(side="left", padx=(10, 0))
+
+    # Avvio primo ciclo grafico
+    aggiorna_flotta()  
+
+
+# ===============================
+# CACHE STRATI STATICI VISTA FLOTTA
+# ===============================
+def cattura_strati_flotta(event=None):  
+    """Dopo un ridisegno completo (solo sfondi): salva buffer sfondi, disegna testi e linee sopra"""
+    global strato_testi_flotta, regioni_sfondo_flotta, testi_mostrati
+    try:
+        # Sfondo di ogni pannello, usato per cancellare un solo testo quando cambia
+        regioni_sfondo_flotta = [canvas.copy_from_bbox(r) for r in riquadri_flotta]  
+        for testo in testi_flotta[:pannelli_disposti]:  
+            ax.draw_artist(testo)  
+        testi_mostrati = [testo.get_text() for testo in testi_flotta[:pannelli_disposti]]  
+        strato_testi_flotta = canvas.copy_from_bbox(fig.bbox)  # Sfondi + testi
+        ax.draw_artist(linee_flotta)  # Anche i ridisegni da ridimensionamento mostrano le linee
+    except Exception as e:
+        print(f"Errore cache flotta: {e}")
+
+
+# ===============================
+# TOGGLE GRANDEZZA VISTA FLOTTA
+# ===============================
+def toggle_grandezza_flotta():  
+    """Alterna grandezza mostrata nei pannelli flotta (temperatura ↔ umidità)"""
+    global grandezza_flotta
+    try:
+        if grandezza_flotta == "temperatura":  
+            grandezza_flotta = "umidita"  
+            pulsante_grandezza.config(text="MOSTRA TEMPERATURA")  
+        else:  
+            grandezza_flotta = "temperatura"  
+            pulsante_grandezza.config(text="MOSTRA UMIDITÀ")  
+    except Exception as e:
+        print(f"Errore toggle grandezza: {e}")
+
+
+# ===============================
+# LOOP RENDERING VISTA FLOTTA
+# ===============================
+def aggiorna_flotta():  
+    """Ciclo rendering flotta: blit delle sole linee, testi ridisegnati solo se cambiano"""
+    global strato_testi_flotta, colori_sfondi_mostrati, turno_testi
+    # Early exit se app chiusa o in pausa
+    if not aggiornamento_attivo or not app_in_esecuzione:  
+        return
+
+    try:
+        with lock:  # Copia atomica solo degli ultimi punti di ogni sensore
+            istantanea = [  
+                (sid, np.array(d["secondi"][-FLOTTA_PUNTI_SPARKLINE:]), np.array(d[grandezza_flotta][-FLOTTA_PUNTI_SPARKLINE:], dtype=float))
+                for sid, d in sorted(flotta.items())
+            ][:FLOTTA_MAX_PANNELLI]
+            totale_sensori = len(flotta)  
+
+        # Nuova griglia solo se cambia il numero di sensori
+        if len(istantanea) != pannelli_disposti:  
+            disponi_pannelli_flotta(len(istantanea))  
+
+        adesso = time.time() - start_flotta  # Tempo attuale nello stesso riferimento delle serie
+        unita = "%" if grandezza_flotta == "umidita" else "°C"  
+        colore_ok = "cyan" if grandezza_flotta == "umidita" else "lime"  # Stessi colori grafici singoli
+        soglia_min, soglia_max = SOGLIE_ALLARME[grandezza_flotta]  
+        segmenti, colori_linee, colori_sfondi, nuovi_testi = [], [], [], []
+        allarmi = 0  
+
+        for i, (sid, X, Y) in enumerate(istantanea):  
+            x0, y0 = celle_flotta[i]
+
+            # Pendenza retta ai minimi quadrati (forma chiusa, niente polyfit) in unità/minuto
+            pendenza = 0.0  
+            if len(X) >= 2:  
+                xm = X - X.mean()  
+                den = np.sum(xm ** 2)  
+                pendenza = np.sum(xm * (Y - Y.mean())) / den * 60 if den > 0 else 0.0  
+
+            # Stato pannello: muto (grigio), allarme (rosso), normale
+            if len(X) == 0 or adesso - X[-1] > FLOTTA_TIMEOUT:  
+                colori_sfondi.append("#262626")  
+                colori_linee.append("#777777")  
+            elif not soglia_min <= Y[-1] <= soglia_max:  
+                colori_sfondi.append("#4a1010")  
+                colori_linee.append("#ff5555")  
+                allarmi += 1  
+            else:  
+                colori_sfondi.append("#1a1a1a")  
+                colori_linee.append(colore_ok)  
+
+            # Sparkline normalizzata nel riquadro inferiore del pannello
+            if len(X) >= 2:  
+                dx = (X[-1] - X[0]) or 1.0  
+                dy = (Y.max() - Y.min()) or 1.0  
+                xs = x0 + 0.06 + 0.88 * (X - X[0]) / dx  
+                ys = y0 + 0.08 + 0.40 * (Y - Y.min()) / dy  
+                segmenti.append(np.column_stack([xs, ys]))  
+            else:  
+                segmenti.append(np.empty((0, 2)))  
+
+            # Testo su 3 righe: ID, valore attuale, freccia + pendenza
+            freccia = "↗" if pendenza > 0.05 else "↘" if pendenza < -0.05 else "→"  
+            valore = f"{Y[-1]:.1f}{unita}" if len(Y) else "--"  
+            nuovi_testi.append(f"{sid}\n{valore}\n{freccia}{pendenza:+.2f}/min")  
+
+        # Un solo aggiornamento per collezione (costo indipendente dal numero pannelli)
+        linee_flotta.set_segments(segmenti)  
+        linee_flotta.set_color(colori_linee)  
+
+        # Refresh canvas solo se widget esiste
+        if canvas and canvas.get_tk_widget().winfo_exists():  
+            if strato_testi_flotta is None or colori_sfondi != colori_sfondi_mostrati:  
+                # Nuova griglia o cambio stato allarme: ridisegno completo (raro), cattura_strati_flotta rifà la cache
+                for testo, stringa in zip(testi_flotta, nuovi_testi):  
+                    testo.set_text(stringa)  
+                sfondi_flotta.set_facecolor(colori_sfondi)  
+                colori_sfondi_mostrati = colori_sfondi  
+                canvas.draw()  
+            else:  
+                # Frame normale: strato cachato + solo i testi cambiati + linee
+                canvas.restore_region(strato_testi_flotta)  
+                cambiati = [i for i, stringa in enumerate(nuovi_testi) if stringa != testi_mostrati[i]]  
+                # ID o valore attuale cambiati: ridisegno immediato (stesso frame di sparkline e colore allarme)
+                urgenti = [i for i in cambiati if nuovi_testi[i].rsplit("\n", 1)[0] != testi_mostrati[i].rsplit("\n", 1)[0]]  
+                # Sola pendenza cambiata: budget fisso per frame, a rotazione tra i pannelli
+                solo_pendenza = sorted(set(cambiati) - set(urgenti), key=lambda i: (i - turno_testi) % len(nuovi_testi))  
+                solo_pendenza = solo_pendenza[:max(0, FLOTTA_TESTI_PER_FRAME - len(urgenti))]  
+                if solo_pendenza:  
+                    turno_testi = solo_pendenza[-1] + 1  
+                cambiati = urgenti + solo_pendenza  
+                for i in cambiati:  
+                    testi_flotta[i].set_text(nuovi_testi[i])  
+                    canvas.restore_region(regioni_sfondo_flotta[i])  # Cancella solo il vecchio testo
+                    ax.draw_artist(testi_flotta[i])  
+                    testi_mostrati[i] = nuovi_testi[i]  
+                if cambiati:  
+                    strato_testi_flotta = canvas.copy_from_bbox(fig.bbox)  
+                ax.draw_artist(linee_flotta)  
+                canvas.blit(fig.bbox)  
+
+        # Aggiornamento status bar
+        status.set(f"Sensori: {totale_sensori} | Allarmi: {allarmi} | Grandezza: {grandezza_flotta}")
+
+    except Exception as e:
+        print(f"Errore rendering flotta: {e}")
+        return
+
+    # Scheduling prossimo frame (loop infinito 250ms)
+    if app_in_esecuzione and aggiornamento_attivo:  
+        root.after(INTERVALLO, aggiorna_flotta)  
+
+
 # ===============================
 # AVVIO THREAD BACKGROUND
 # ===============================
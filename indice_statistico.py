@@ -0,0 +1,142 @@
+import numpy as np  # Array numerici per somme cumulative e sparse table
+
+
+# ===============================
+# CONFIGURAZIONE INDICE
+# ===============================
+CAPACITA_INIZIALE = 1024  # Campioni allocati all'inizio (raddoppia fino al massimo)
+
+
+def _due_somme(a, b):
+    """Somma esatta a + b = s + e (TwoSum di Knuth, anche su array): e = errore di arrotondamento"""
+    s = a + b
+    bb = s - a
+    return s, (a - (s - bb)) + (b - bb)
+
+
+# ===============================
+# INDICE SOMME CUMULATIVE + SPARSE TABLE
+# ===============================
+class IndiceStatistico:
+    """Storico di una serie (t, y) con statistiche su qualsiasi intervallo in O(1)/O(log n)
+
+    Somme cumulative di 1, y, y², t, t², t·y → media, varianza e pendenza retta in O(1).
+    Le somme sono compensate (valore + resto di arrotondamento): la differenza tra due prefissi
+    resta esatta anche a fine storico, dove t² e i prefissi sono enormi rispetto all'intervallo.
+    Sparse table min/max (livello k = finestra di 2^k campioni che TERMINA in i) → O(1).
+    Ricerca estremi intervallo temporale con searchsorted → O(log n).
+    Aggiunta campione O(log n); oltre `max_punti` i campioni più vecchi vengono scartati.
+    Memoria a regime: 1.25·max_punti × (8 + 2×6×8 + 2×livelli×4) byte (~54MB per 172800 campioni).
+    """
+
+    def __init__(self, max_punti):
+        self.max_punti = max_punti  # Campioni massimi conservati (FIFO)
+        self.livelli = max(1, max_punti.bit_length())  # Livelli sparse table: 2^livelli > max_punti
+        self.capacita_max = max_punti + max(1, max_punti // 4)  # Margine: compattazione ogni max/4 campioni
+        self.azzera()
+
+    def azzera(self):
+        """Svuota lo storico (nuova sessione di acquisizione)"""
+        self._alloca(min(CAPACITA_INIZIALE, self.capacita_max))
+        self.inizio = 0  # Posizione primo campione valido nel buffer
+        self.fine = 0  # Posizione successiva all'ultimo campione
+
+    def _alloca(self, capacita):
+        """Alloca buffer vuoti di `capacita` campioni"""
+        self.t = np.zeros(capacita)  # Tempi (crescenti)
+        self.somme = np.zeros((6, capacita + 1))  # Prefissi: [1, y, y², t, t², t·y], somme[:, i] = Σ primi i
+        self.resti = np.zeros((6, capacita + 1))  # Errori di arrotondamento accumulati dei prefissi
+        self.minimi = np.zeros((self.livelli, capacita), dtype=np.float32)  # Sparse table minimi
+        self.massimi = np.zeros((self.livelli, capacita), dtype=np.float32)  # Sparse table massimi
+
+    def _sposta(self, capacita):
+        """Riporta i campioni validi a inizio buffer (e ridimensiona se serve)"""
+        vecchi = (self.t, self.somme, self.resti, self.minimi, self.massimi)
+        a, b = self.inizio, self.fine
+        self._alloca(capacita)
+        self.t[:b - a] = vecchi[0][a:b]
+        # Differenze tra prefissi invariate: sottrarre somme[a] (in modo esatto) mantiene i numeri piccoli
+        somme, errori = _due_somme(vecchi[1][:, a:b + 1], -vecchi[1][:, a:a + 1])
+        self.somme[:, :b - a + 1] = somme
+        self.resti[:, :b - a + 1] = vecchi[2][:, a:b + 1] - vecchi[2][:, a:a + 1] + errori
+        # Le voci che puntano prima del nuovo inizio non vengono mai interrogate
+        self.minimi[:, :b - a] = vecchi[3][:, a:b]
+        self.massimi[:, :b - a] = vecchi[4][:, a:b]
+        self.inizio, self.fine = 0, b - a
+
+    def __len__(self):
+        return self.fine - self.inizio
+
+    def aggiungi(self, t, y):
+        """Aggiunge un campione (t crescente) in O(log n)"""
+        # Spazio esaurito: prima raddoppia, al massimo compatta eliminando i campioni scartati
+        if self.fine == len(self.t):
+            self._sposta(min(2 * len(self.t), self.capacita_max))
+
+        i = self.fine
+        self.t[i] = t
+        self.somme[:, i + 1], errori = _due_somme(self.somme[:, i], np.array((1.0, y, y * y, t, t * t, t * y)))
+        self.resti[:, i + 1] = self.resti[:, i] + errori
+
+        # Sparse table: finestra 2^k che termina in i = unione di due finestre 2^(k-1)
+        self.minimi[0, i] = self.massimi[0, i] = y
+        for k in range(1, self.livelli):
+            meta = 1 << (k - 1)
+            if i - 2 * meta + 1 < 0:
+                break  # Finestra oltre l'inizio del buffer
+            self.minimi[k, i] = min(self.minimi[k - 1, i], self.minimi[k - 1, i - meta])
+            self.massimi[k, i] = max(self.massimi[k - 1, i], self.massimi[k - 1, i - meta])
+        self.fine += 1
+
+        # Limitazione memoria: FIFO oltre max_punti (nessuna copia, si sposta solo l'inizio)
+        if len(self) > self.max_punti:
+            self.inizio += 1
+
+    def posizioni(self, t_da=None, t_a=None):
+        """Indici buffer [l, r) dei campioni con t_da <= t <= t_a (ricerca binaria)"""
+        validi = self.t[self.inizio:self.fine]
+        l = self.inizio + (0 if t_da is None else int(np.searchsorted(validi, t_da, side="left")))
+        r = self.inizio + (len(validi) if t_a is None else int(np.searchsorted(validi, t_a, side="right")))
+        return l, r
+
+    def statistiche(self, t_da=None, t_a=None):
+        """Conteggio, media, varianza, min/max e retta ai minimi quadrati nell'intervallo (None = tutto)"""
+        l, r = self.posizioni(t_da, t_a)
+        if r <= l:
+            return None  # Nessun campione nell'intervallo
+
+        # Somme dell'intervallo come differenza di prefissi compensati (O(1))
+        somme, errori = _due_somme(self.somme[:, r], -self.somme[:, l])
+        n, sy, syy, st, stt, sty = somme + (errori + (self.resti[:, r] - self.resti[:, l]))
+        media = sy / n
+        varianza = max(syy / n - media ** 2, 0.0)  # Clamp errori di arrotondamento
+
+        # Origine tempi locale c = primo campione: Σ(t−c), Σ(t−c)², Σ(t−c)·y restano piccoli
+        c = self.t[l]
+        su = st - n * c
+        suu = stt - 2 * c * st + n * c * c
+        suy = sty - c * sy
+
+        # Retta y = pendenza·t + intercetta con somme centrate Σ(t−t̄)², Σ(t−t̄)(y−ȳ)
+        sxx = suu - su * su / n
+        sxy = suy - su * sy / n
+        pendenza = sxy / sxx if sxx > 0 else 0.0
+        intercetta = media - pendenza * (c + su / n)
+
+        # Min/max: due finestre 2^k sovrapposte che coprono [l, r-1] (O(1))
+        k = (r - l).bit_length() - 1
+        minimo = min(self.minimi[k, r - 1], self.minimi[k, l + (1 << k) - 1])
+        massimo = max(self.massimi[k, r - 1], self.massimi[k, l + (1 << k) - 1])
+
+        return {
+            "n": int(n),
+            "t_da": float(self.t[l]),
+            "t_a": float(self.t[r - 1]),
+            "media": float(media),
+            "varianza": float(varianza),
+            "dev_std": float(np.sqrt(varianza)),
+            "min": float(minimo),
+            "max": float(massimo),
+            "pendenza": float(pendenza),
+            "intercetta": float(intercetta),
+        }
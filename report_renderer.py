@@ -0,0 +1,274 @@
+import json  # Descrizione lavoro report (elenco grafici da generare)
+import os  # Percorsi file di lavoro e cartelle di destinazione
+import re  # Pulizia caratteri non ammessi nei nomi file
+import subprocess  # Avvio renderer in un processo separato (GUI mai bloccata)
+import sys  # Interprete Python corrente per lanciare il processo worker
+import numpy as np  # Array numerici, regressioni e archivio dati .npz
+import matplotlib  # Libreria grafici: qui SOLO API a oggetti, nessun pyplot
+import matplotlib.style  # Tema dark applicato solo durante la costruzione figure
+from matplotlib.figure import Figure  # Figura indipendente dal backend della GUI
+from matplotlib.backends.backend_agg import FigureCanvasAgg  # Rendering raster offscreen
+from matplotlib.ticker import FormatStrFormatter  # Tick con 1 decimale come grafico live
+import matplotlib.image as mpimg  # Scrittura buffer RGBA → PNG
+
+
+# ===============================
+# CONFIGURAZIONE REPORT
+# ===============================
+DPI = 150  # Risoluzione report (come vecchio salvataggio PNG)
+FIGSIZE = (8, 4)  # Dimensioni figura in pollici (come grafico live)
+FORMATI = ("png", "svg", "pdf")  # Formati supportati
+MAX_STRATI_CACHE = 8  # Layout statici tenuti in memoria (i più vecchi vengono scartati)
+COLORI = {"umidita": "cyan", "temperatura": "lime"}  # Stessi colori del grafico live
+ETICHETTE = {"umidita": "Umidità (%)", "temperatura": "Temperatura (°C)", "entrambe": "Valore"}
+
+
+# ===============================
+# CACHE STRATI STATICI
+# ===============================
+_cache_strati = {}  # {(grandezza, xlim, ylim): strato} con figura, assi, legenda e sfondo già disegnati
+
+
+def _limiti_y(grandezza, valori):
+    """Limiti Y arrotondati a multipli di 5: report simili riusano lo stesso strato statico"""
+    if grandezza == "umidita":
+        return (0.0, 100.0)  # Umidità sempre su scala fissa
+    if len(valori) == 0:
+        basso, alto = 0.0, 5.0
+    else:
+        basso = 5.0 * np.floor(np.min(valori) / 5.0)
+        alto = 5.0 * np.ceil(np.max(valori) / 5.0)
+        if alto == basso:
+            alto += 5.0  # Serie costante: evita asse degenere
+    if grandezza == "entrambe":
+        return (min(basso, 0.0), max(alto, 100.0))  # Deve contenere anche l'umidità
+    return (basso, alto)
+
+
+def _crea_strato(grandezza, xlim, ylim):
+    """Costruisce figura, assi, griglia e legenda una volta sola + artisti dati vuoti"""
+    with matplotlib.style.context("dark_background"):  # Tema dark senza toccare la GUI
+        fig = Figure(figsize=FIGSIZE, dpi=DPI)
+        canvas = FigureCanvasAgg(fig)
+        ax = fig.add_axes([0.1, 0.14, 0.86, 0.76])  # Margini fissi: niente bbox "tight" per ogni report
+        ax.grid(True, alpha=0.3)
+        ax.set_xlabel("Tempo dall'inizio intervallo (s)", fontsize=10)
+        ax.set_ylabel(ETICHETTE[grandezza], fontsize=10)
+        ax.yaxis.set_major_formatter(FormatStrFormatter('%.1f'))
+        ax.xaxis.set_major_formatter(FormatStrFormatter('%.1f'))
+        ax.set_xlim(*xlim)
+        ax.set_ylim(*ylim)
+
+        # Artisti dinamici preallocati (animated=True → esclusi dallo strato statico)
+        artisti = {}
+        for nome in (["umidita", "temperatura"] if grandezza == "entrambe" else [grandezza]):
+            colore = COLORI[nome]
+            suffisso = "" if grandezza != "entrambe" else (" Umidità" if nome == "umidita" else " Temperatura")
+            artisti[nome] = (
+                ax.scatter([], [], color=colore, s=20, label="Dati" + suffisso, animated=True),
+                ax.plot([], [], "--", color="orange" if grandezza != "entrambe" else colore, linewidth=2, label="Retta" + suffisso, animated=True)[0],
+                ax.plot([], [], "-.", color="magenta" if grandezza != "entrambe" else colore, linewidth=2, label="Parabola" + suffisso, animated=True)[0],
+            )
+        # Legenda a posizione fissa ma animated: va disegnata SOPRA i dati (come in un disegno completo)
+        legenda = ax.legend(loc="upper right", fontsize=8)
+        legenda.set_animated(True)
+        titolo = fig.text(0.5, 0.96, "", ha="center", va="top", fontsize=11, fontweight="bold", animated=True)
+
+        # Rendering unico dello strato statico e copia del buffer
+        canvas.draw()
+        sfondo = canvas.copy_from_bbox(fig.bbox)
+    return {"fig": fig, "canvas": canvas, "ax": ax, "artisti": artisti, "legenda": legenda, "titolo": titolo, "sfondo": sfondo}
+
+
+def _strato(grandezza, xlim, ylim):
+    """Restituisce strato statico dalla cache (creandolo se manca)"""
+    chiave = (grandezza, xlim, ylim)
+    if chiave not in _cache_strati:
+        if len(_cache_strati) >= MAX_STRATI_CACHE:
+            _cache_strati.pop(next(iter(_cache_strati)))  # Scarta il layout più vecchio
+        _cache_strati[chiave] = _crea_strato(grandezza, xlim, ylim)
+    return _cache_strati[chiave]
+
+
+# ===============================
+# RENDERING SINGOLO REPORT
+# ===============================
+def _aggiorna_serie(artisti, X, Y):
+    """Aggiorna dati, retta e parabola di una serie sugli artisti preallocati"""
+    punti, retta, parabola = artisti
+    punti.set_offsets(np.column_stack([X, Y]) if len(X) else np.empty((0, 2)))
+    retta.set_data([], [])
+    parabola.set_data([], [])
+    if len(X) >= 2 and np.ptp(X) > 0:
+        coeff_ang, intercetta = np.polyfit(X, Y, 1)
+        retta.set_data(X, coeff_ang * X + intercetta)
+    if len(X) >= 3 and np.ptp(X) > 0:
+        a, b, c = np.polyfit(X, Y, 2)
+        xp = np.linspace(X.min(), X.max(), 200)  # 200 punti per curva fluida
+        parabola.set_data(xp, a * xp**2 + b * xp + c)
+
+
+def renderizza_report(serie, report):
+    """Genera i file di un report (PNG/SVG/PDF) per un sensore e un intervallo di tempo"""
+    grandezza = report.get("grandezza", "entrambe")
+    secondi = np.asarray(serie["secondi"], dtype=float)
+
+    # Selezione intervallo richiesto (None = tutta la serie)
+    t_inizio = report.get("t_inizio")
+    t_fine = report.get("t_fine")
+    if t_inizio is None:
+        t_inizio = float(secondi.min()) if len(secondi) else 0.0
+    maschera = secondi >= t_inizio
+    if t_fine is not None:
+        maschera &= secondi < t_fine
+    X = secondi[maschera] - t_inizio  # Tempo relativo: intervalli uguali → stesso strato statico
+    valori = {nome: np.asarray(serie[nome], dtype=float)[maschera] for nome in ("umidita", "temperatura")}
+
+    # Asse X: durata richiesta o arrotondata al minuto
+    durata = (t_fine - t_inizio) if t_fine is not None else 60.0 * np.ceil(max(X.max() if len(X) else 0.0, 1.0) / 60.0)
+    visibili = np.concatenate([valori[n] for n in (["umidita", "temperatura"] if grandezza == "entrambe" else [grandezza])])
+    strato = _strato(grandezza, (0.0, float(durata)), _limiti_y(grandezza, visibili))
+
+    # Solo gli artisti dinamici cambiano da un report all'altro
+    for nome, artisti in strato["artisti"].items():
+        _aggiorna_serie(artisti, X, valori[nome])
+    strato["titolo"].set_text(
+        f"{report.get('sensore', '')} · {grandezza.upper()} · t = {t_inizio:.0f}–{t_inizio + durata:.0f} s"
+    )
+
+    generati = []
+    for formato in report.get("formati", ["png"]):
+        percorso = f"{report['file']}.{formato}"
+        if formato == "png":
+            # Raster: ripristina sfondo cachato (assi, griglia, etichette) e disegna dati, poi legenda sopra
+            canvas = strato["canvas"]
+            canvas.restore_region(strato["sfondo"])
+            for artisti in strato["artisti"].values():
+                for artista in artisti:
+                    strato["ax"].draw_artist(artista)
+            strato["ax"].draw_artist(strato["legenda"])
+            strato["fig"].draw_artist(strato["titolo"])
+            mpimg.imsave(percorso, np.asarray(canvas.buffer_rgba()), dpi=DPI)
+        elif formato in FORMATI:
+            # Vettoriale: figura già costruita, serve solo il salvataggio
+            # (la Figure scarta SEMPRE i suoi artisti animated, anche in savefig: titolo reso statico solo qui)
+            strato["titolo"].set_animated(False)
+            try:
+                strato["fig"].savefig(percorso, format=formato, dpi=DPI)
+            finally:
+                strato["titolo"].set_animated(True)  # Fuori dallo strato statico per i PNG successivi
+        else:
+            raise ValueError(f"Formato non supportato: {formato}")
+        generati.append(percorso)
+    return generati
+
+
+# ===============================
+# NOMI UNIVOCI PER SENSORE (FILE / FOGLI EXCEL)
+# ===============================
+VIETATI_FILE = r'[<>:"/\\|?*\x00-\x1f]'  # Caratteri non ammessi nei nomi file (Windows)
+VIETATI_FOGLIO = r"[\[\]:*?/\\]"  # Caratteri non ammessi nei nomi foglio Excel
+
+
+def nomi_univoci(sensori, vietati, max_len=None, bordi=" .", predefinito="sensore", riservati=()):
+    """Nome pulito e univoco per ogni sensore: `vietati` → "_", max `max_len` caratteri, suffissi _2, _3..."""
+    nomi = {}
+    usati = {r.lower() for r in riservati}  # Confronto senza maiuscole/minuscole (Windows, Excel)
+    for sid in sensori:
+        base = re.sub(vietati, "_", str(sid))[:max_len].strip(bordi) or predefinito  # No `bordi` agli estremi
+        nome, n = base, 2
+        while nome.lower() in usati:  # Collisione (es. "a:b" e "a/b" → "a_b"): suffisso _2, _3...
+            suffisso = f"_{n}"
+            nome = (base if max_len is None else base[:max_len - len(suffisso)]) + suffisso
+            n += 1
+        usati.add(nome.lower())
+        nomi[sid] = nome
+    return nomi
+
+
+def nomi_file_sensori(sensori):
+    """Parte di nome file valida e univoca per ogni sensore (niente <>:"/\\|?* né controlli)"""
+    return nomi_univoci(sensori, VIETATI_FILE)
+
+
+def nomi_fogli_excel(sensori):
+    """Nome foglio valido e univoco per ogni sensore (max 31 caratteri, niente []:*?/\\, non "History")"""
+    return nomi_univoci(sensori, VIETATI_FOGLIO, max_len=31, bordi="'", predefinito="Sensore", riservati=("history",))
+
+
+# ===============================
+# PIANIFICAZIONE REPORT PERIODICI
+# ===============================
+def pianifica_report_periodici(serie_per_sensore, cartella, periodo=3600, grandezza="entrambe", formati=("png",)):
+    """Un report per ogni sensore e ogni finestra di `periodo` secondi coperta dai dati"""
+    report = []
+    nomi = nomi_file_sensori(sorted(serie_per_sensore))
+    for sid, serie in sorted(serie_per_sensore.items()):
+        if len(serie["secondi"]) == 0:
+            continue  # Sensore senza dati: nessun report
+        primo = int(np.floor(min(serie["secondi"]) / periodo))
+        ultimo = int(np.floor(max(serie["secondi"]) / periodo))
+        for k in range(primo, ultimo + 1):
+            report.append({
+                "file": os.path.join(cartella, f"{nomi[sid]}_{grandezza}_{k * periodo:07d}s"),
+                "sensore": sid,
+                "grandezza": grandezza,
+                "t_inizio": k * periodo,
+                "t_fine": (k + 1) * periodo,
+                "formati": list(formati),
+            })
+    return report
+
+
+# ===============================
+# FILE DI LAVORO (GUI → WORKER)
+# ===============================
+def scrivi_lavoro(percorso_base, serie_per_sensore, report):
+    """Salva dati (.npz) ed elenco report (.json) da passare al processo worker"""
+    sensori = sorted(serie_per_sensore)
+    array = {}
+    for n, sid in enumerate(sensori):
+        for nome in ("secondi", "umidita", "temperatura"):
+            array[f"{n}_{nome}"] = np.asarray(serie_per_sensore[sid][nome], dtype=float)
+    np.savez(percorso_base + ".npz", **array)
+    with open(percorso_base + ".json", "w", encoding="utf-8") as f:
+        json.dump({"dati": percorso_base + ".npz", "sensori": sensori, "report": report}, f)
+    return percorso_base + ".json"
+
+
+def esegui_lavoro(percorso_json):
+    """Carica file di lavoro e genera tutti i report richiesti (eseguito nel worker)"""
+    with open(percorso_json, encoding="utf-8") as f:
+        lavoro = json.load(f)
+    with np.load(lavoro["dati"]) as dati:
+        serie_per_sensore = {
+            sid: {nome: dati[f"{n}_{nome}"] for nome in ("secondi", "umidita", "temperatura")}
+            for n, sid in enumerate(lavoro["sensori"])
+        }
+    generati = []
+    for report in lavoro["report"]:
+        generati += renderizza_report(serie_per_sensore[report["sensore"]], report)
+    return generati
+
+
+def avvia_in_background(percorso_json, percorso_log):
+    """Lancia il renderer in un processo separato; output su file (niente pipe piene)"""
+    log = open(percorso_log, "w", encoding="utf-8")
+    try:
+        return subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), percorso_json],
+            stdout=log,
+            stderr=subprocess.STDOUT,
+            env={**os.environ, "PYTHONIOENCODING": "utf-8"}  # Log sempre UTF-8 (Windows userebbe la code page ANSI)
+        )
+    finally:
+        log.close()  # Il processo figlio ha già il suo handle
+
+
+# ===============================
+# ENTRY POINT PROCESSO WORKER
+# ===============================
+if __name__ == "__main__":
+    matplotlib.use("Agg")  # Worker senza display: solo backend offscreen
+    file_generati = esegui_lavoro(sys.argv[1])
+    print(f"✓ {len(file_generati)} file generati")
@@ -0,0 +1,57 @@
+import numpy as np  # Riferimento: statistiche calcolate direttamente sui campioni
+from indice_statistico import IndiceStatistico
+
+
+# ===============================
+# STORICO LUNGO (3 GIORNI A 1 HZ)
+# ===============================
+def _storico_lungo():
+    """Indice da 2 giorni alimentato con 3 giorni: rampa 0.6/min fino a 258500 s, poi costante"""
+    t = np.arange(0, 3 * 86400, 1.0)
+    y = np.where(t < 258500, 20.0 + 0.01 * (t % 7200), 23.37)  # 23.37 non rappresentabile esatto
+    indice = IndiceStatistico(172800)
+    for ti, yi in zip(t, y):
+        indice.aggiungi(ti, yi)
+    return indice, t, y
+
+
+INDICE, T, Y = _storico_lungo()
+
+
+def _maschera(t_da, t_a):
+    return (T >= t_da) & (T <= t_a)
+
+
+def test_pendenza_intervallo_breve_fine_storico():
+    """5 campioni vicino a t≈258000 s: pendenza uguale a np.polyfit"""
+    m = _maschera(258000, 258004)
+    st = INDICE.statistiche(258000, 258004)
+    assert st["n"] == 5
+    assert np.isclose(st["pendenza"], np.polyfit(T[m], Y[m], 1)[0], rtol=1e-6)
+
+
+def test_pendenza_nulla_intervallo_breve():
+    """10 campioni costanti a fine storico: pendenza ~0 (nessun rumore numerico)"""
+    st = INDICE.statistiche(259000, 259009)
+    assert st["n"] == 10
+    assert abs(st["pendenza"]) < 1e-9
+    assert np.isclose(st["media"], 23.37) and st["varianza"] < 1e-9
+
+
+def test_statistiche_come_numpy():
+    """Media, varianza, min/max e retta su intervalli vari coincidono con numpy"""
+    for t_da, t_a in ((100000, 100099), (180000, 250000), (258400, 258600), (None, None)):
+        st = INDICE.statistiche(t_da, t_a)
+        m = _maschera(T[0] if t_da is None else t_da, T[-1] if t_a is None else t_a)
+        m &= T >= T[-1] - 172800 + 1  # Solo campioni ancora nello storico (FIFO)
+        assert st["n"] == m.sum()
+        assert np.isclose(st["media"], Y[m].mean(), rtol=1e-12)
+        assert np.isclose(st["varianza"], Y[m].var(), rtol=1e-8, atol=1e-9)
+        assert np.isclose(st["min"], Y[m].min(), rtol=1e-6) and np.isclose(st["max"], Y[m].max(), rtol=1e-6)
+        assert np.isclose(st["pendenza"], np.polyfit(T[m], Y[m], 1)[0], rtol=1e-6, atol=1e-12)
+
+
+def test_intervallo_vuoto_e_fuori_storico():
+    """Nessun campione nell'intervallo (o già scartato dal FIFO) → None"""
+    assert INDICE.statistiche(10, 20) is None
+    assert INDICE.statistiche(1e9, 2e9) is None